@@ -3,3 +3,10 @@ from .profiles import *
 from .motors import *
 from .drivetrain import *
 from .conversions import *
+from .multiaxis import *
+from .duty import *
+from .streaming import *
+from .steps import *
+from .montecarlo import *
+from .cache import *
+from .feasibility import *
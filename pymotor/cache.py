@@ -0,0 +1,234 @@
+
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+import pymotor.drivetrain as drivetrain
+import pymotor.motors as motors
+import pymotor.profiles as profiles
+import pymotor.segments as segments
+from pymotor.drivetrain import _as_transmission
+from pymotor.profiles import LinearMotion, LinearForce, AngularTorque
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = '.npz'
+
+
+class ResultCache:
+    '''ResultCache objects keep LinearMotion, LinearForce and AngularTorque
+        results in an on-disk cache, so identical runs are loaded rather
+        than recomputed. The cache is opt-in: results are only cached when
+        created through a ResultCache.
+
+    ResultCache.directory is the cache directory, created if needed.
+
+    ResultCache.max_bytes caps the total size of the cache. When it is
+        exceeded, the least recently used entries are removed.
+
+    ResultCache.salt is mixed into every key together with CACHE_VERSION
+        and a hash of the pymotor source that computes results, so code
+        changes invalidate stale entries.
+
+    Keys are stable hashes of the settings dictionaries and the Motor and
+        drivetrain parameters. Entries are stored as compressed numpy .npz
+        files, written to a temporary file and atomically renamed, so
+        several processes can share one cache directory.
+
+    ResultCache.linear_motion(settings), ResultCache.linear_force(...) and
+        ResultCache.angular_torque(...) return the same objects as the
+        LinearMotion, LinearForce and AngularTorque constructors. Only the
+        requested result is stored: the profile of a LinearForce or
+        AngularTorque entry already holds the upstream columns, and the
+        upstream settings and stats are kept in its metadata.
+    '''
+    def __init__(self, directory, max_bytes=2**30, salt=''):
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.salt = str(salt)
+        self._code_salt = self._get_code_salt()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, kind, *parts):
+        '''Returns the stable hex key for a result kind and its parameters.'''
+        data = [CACHE_VERSION, self._code_salt, self.salt, kind, [self._describe(part) for part in parts]]
+        text = json.dumps(data, sort_keys=True, default=self._json_default)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        '''Returns (meta, profile) for key, or None if it is not cached.'''
+        path = self._get_path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+                profile = pd.DataFrame({column: data['column_' + column] for column in meta['columns']})
+            os.utime(path)
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+        return (meta, profile)
+
+    def put(self, key, meta, profile):
+        '''Stores a meta dictionary and profile DataFrame under key.'''
+        meta = dict(meta, columns=[str(column) for column in profile.columns])
+        arrays = {'column_' + str(column): profile[column].values for column in profile.columns}
+        arrays['meta'] = np.frombuffer(json.dumps(meta, default=self._json_default).encode('utf-8'), dtype='uint8')
+
+        (handle, temp_path) = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(temp_path, self._get_path(key))
+        except BaseException:
+            self._remove(temp_path)
+            raise
+
+        self._evict()
+
+    def clear(self):
+        '''Removes every cache entry.'''
+        for (path, size, mtime) in self._get_entries():
+            self._remove(path)
+
+    def linear_motion(self, settings):
+
+        key = self.key('LinearMotion', settings)
+        cached = self.get(key)
+
+        if cached is None:
+            lm = LinearMotion(settings)
+            self.put(key, {'settings': lm.settings, 'stats': lm.stats}, lm.profile)
+            return lm
+
+        (meta, profile) = cached
+        lm = LinearMotion.__new__(LinearMotion)
+        lm.settings = meta['settings']
+        lm.stats = meta['stats']
+        lm.profile = profile
+        return lm
+
+    def linear_force(self, settings, lm_settings, sensitivities=False):
+
+        key = self.key('LinearForce', settings, lm_settings, sensitivities)
+        cached = self.get(key)
+
+        if cached is None:
+            lm = LinearMotion(lm_settings)
+            lm_stats = lm.stats
+            lf = LinearForce(settings, lm, sensitivities)
+            self.put(key, {'settings': lf.settings, 'stats': lf.stats, 'lm_stats': lm_stats}, lf.profile)
+            return lf
+
+        (meta, profile) = cached
+        lf = self._get_linear_force(meta, lm_settings, sensitivities)
+        lf.profile = profile
+        return lf
+
+    def angular_torque(self, lm_settings, lf_settings, motor, coupler=None, gear=None, drivetrain=None,
+        sensitivities=False):
+
+        transmission = _as_transmission(drivetrain, coupler, gear)
+        key = self.key('AngularTorque', lm_settings, lf_settings, motor, transmission, sensitivities)
+        cached = self.get(key)
+
+        if cached is None:
+            lf = LinearForce(lf_settings, LinearMotion(lm_settings), sensitivities)
+            meta = {'lf_settings': lf.settings, 'lf_stats': lf.stats, 'lm_stats': lf.lm.stats}
+            at = AngularTorque(lf, motor, coupler, gear, drivetrain, sensitivities)
+            self.put(key, dict(meta, settings=at.settings, stats=at.stats), at.profile)
+            return at
+
+        (meta, profile) = cached
+        lf = self._get_linear_force(dict(meta, settings=meta['lf_settings'], stats=meta['lf_stats']),
+            lm_settings, sensitivities)
+
+        at = AngularTorque.__new__(AngularTorque)
+        at.lf = lf
+        at.motor = motor
+        at.coupler = coupler
+        at.gear = gear
+        at.drivetrain = drivetrain
+        at.transmission = transmission
+        at.sensitivities = sensitivities
+        at.settings = meta['settings']
+        at.stats = {}
+        at._calc_torque_constants()
+        at.stats = meta['stats']
+        at.profile = profile
+        return at
+
+    def _get_linear_force(self, meta, lm_settings, sensitivities):
+        '''Rebuilds a LinearForce, and the LinearMotion it consumed, without profiles.'''
+        lm = LinearMotion.__new__(LinearMotion)
+        lm.settings = lm_settings
+        lm.stats = meta['lm_stats']
+
+        lf = LinearForce.__new__(LinearForce)
+        lf.lm = lm
+        lf.settings = meta['settings']
+        lf.sensitivities = sensitivities
+        lf.stats = {}
+        lf._calc_force_constants()
+        lf.stats = meta['stats']
+        return lf
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def _get_entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(CACHE_SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        entries = self._get_entries()
+        total = sum(size for (path, size, mtime) in entries)
+        for (path, size, mtime) in sorted(entries, key=lambda entry: entry[2]):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _get_code_salt(self):
+        code = hashlib.sha256()
+        for module in (profiles, segments, motors, drivetrain):
+            with open(module.__file__, 'rb') as f:
+                code.update(f.read())
+        return code.hexdigest()
+
+    def _describe(self, part):
+        '''Returns the JSON-able parameters that determine a result.'''
+        if isinstance(part, motors.Motor):
+            return {
+                'j': part.j,
+                'd_out': part.d_out,
+                'curve_hz': part.curve['hz'].values,
+                'curve_tau': part.curve['tau'].values,
+                'lut_interp': part.lut_interp,
+                'lut_tau': part.lut_tau,
+                }
+        if isinstance(part, drivetrain.Transmission):
+            return [vars(element) for element in part.elements]
+        return part
+
+    def _json_default(self, value):
+        if isinstance(value, (np.ndarray, np.generic)):
+            return value.tolist()
+        raise TypeError("Cannot hash value of type " + type(value).__name__ + ".")
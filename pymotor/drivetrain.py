@@ -1,4 +1,7 @@
 
+import numpy as np
+
+
 class Direct:
     def __init__(self, j=0.0):
         self.type = 'direct'
@@ -15,6 +18,8 @@ class Wheel:
     def __init__(self, diameter, j=0.0):
         self.type = 'wheel'
         self.diameter = diameter
+        self.lead = np.pi * diameter
+        self.pitch = 1/self.lead
         self.j = j
 
 
@@ -43,4 +48,113 @@ class Gear:
         self.ratio = ratio
         self.j_in = j_in
         self.j_out = j_out
- 
\ No newline at end of file
+
+
+class Transmission:
+    '''Transmission objects describe an ordered chain of drivetrain elements
+        from the motor shaft to the load.
+
+    Transmission.elements is a list of Coupler, Direct, Gear, Screw and Wheel
+        objects. Couplers, Direct elements and Gears may appear in any order,
+        and the last element must be a Screw or Wheel.
+
+    The chain is reduced once to coefficients referred to the motor shaft:
+        Transmission.ratio is the product of all gear ratios.
+        Transmission.lead and Transmission.pitch are the output element's.
+        Transmission.j is the reflected rotating inertia in kg*m^2.
+        Transmission.j_in is the reflected inertia upstream of the first gear
+            output, Transmission.j_out the remaining inertia referred to the
+            output shaft, so j = j_in + j_out / ratio^2.
+        Transmission.xva_scale converts m to motor revs.
+        Transmission.tau_linear_scale converts N to motor N*m.
+
+    Transmission.replace(index, element) swaps one element and recomputes
+        only the terms it affects.
+    '''
+    def __init__(self, elements):
+        self.type = 'transmission'
+        self.elements = list(elements)
+        self._states = []
+        self._terms = []
+        self._reduce(0)
+
+    def replace(self, index, element):
+        '''Swaps the element at index and updates the cached coefficients.'''
+        self.elements[index] = element
+        self._reduce(index)
+
+    def j_after(self, index):
+        '''Returns the inertia (kg*m^2) at the motor shaft on the output side of the element at index.'''
+        element = self.elements[index]
+        j = element.j_out / self._states[index][0]**2 if element.type == 'gear' else 0.0
+        return j + sum(sum(term) for term in self._terms[index + 1:])
+
+    def _reduce(self, index):
+
+        elements = self.elements
+        if len(elements) == 0 or elements[-1].type not in ('screw', 'wheel'):
+            raise ValueError("The last Transmission element must be a Screw or Wheel.")
+
+        for element in elements[:-1]:
+            if element.type not in ('coupler', 'direct', 'gear'):
+                raise ValueError("Only the last Transmission element can be a Screw or Wheel.")
+
+        del self._states[len(elements):]
+        del self._terms[len(elements):]
+
+        for k in range(index, len(elements)):
+
+            (ratio, past_gear) = self._states[k - 1] if k > 0 else (1.0, False)
+            state = self._get_state(elements[k], ratio, past_gear)
+            term = self._get_term(elements[k], ratio, past_gear)
+
+            unchanged = k < len(self._states) and self._states[k] == state
+            if k < len(self._terms):
+                self._states[k] = state
+                self._terms[k] = term
+            else:
+                self._states.append(state)
+                self._terms.append(term)
+            if unchanged:
+                break
+
+        self.ratio = self._states[-1][0]
+        self.lead = elements[-1].lead
+        self.pitch = elements[-1].pitch
+        self.xva_scale = self.pitch * self.ratio
+        self.tau_linear_scale = self.lead / (2.0 * np.pi * self.ratio)
+        self.j_in = sum(term[0] for term in self._terms)
+        self.j_out = sum(term[1] for term in self._terms) * self.ratio**2
+        self.j = self.j_in + self.j_out / self.ratio**2
+
+    def _get_state(self, element, ratio, past_gear):
+        if element.type == 'gear':
+            return (ratio * element.ratio, True)
+        return (ratio, past_gear)
+
+    def _get_term(self, element, ratio, past_gear):
+        '''Returns element inertia at the motor shaft split as (j_in, j_out).'''
+        if element.type == 'gear':
+            j_gear_in = element.j_in / ratio**2
+            j_gear_out = element.j_out / (ratio * element.ratio)**2
+            if past_gear:
+                return (0.0, j_gear_in + j_gear_out)
+            return (j_gear_in, j_gear_out)
+        if past_gear:
+            return (0.0, element.j / ratio**2)
+        return (element.j / ratio**2, 0.0)
+
+
+def _as_transmission(drivetrain, coupler=None, gear=None):
+    '''Returns drivetrain as a Transmission, chaining coupler and gear if needed.'''
+    if drivetrain is None:
+        raise ValueError("A drivetrain (Screw, Wheel or Transmission) is required.")
+    if isinstance(drivetrain, Transmission):
+        if coupler is not None or gear is not None:
+            raise ValueError("coupler and gear must be part of the Transmission.")
+        return drivetrain
+    if coupler is None:
+        coupler = Coupler()
+    if gear is None:
+        gear = Gear()
+    return Transmission([coupler, gear, drivetrain])
@@ -0,0 +1,151 @@
+
+import numpy as np
+
+import pymotor.files as files
+
+
+class DutyCycle:
+    '''DutyCycle objects evaluate a repeated schedule of moves and dwells
+        from per cycle reductions, without tiling the sample arrays.
+
+    One cycle is each AngularTorque move followed by its dwell, in order.
+
+    DutyCycle.settings keys:
+        'dwell_t' is the dwell time in s after each move, a list with one
+            entry per move or a single value used for every move.
+        'dwell_tau' is the holding torque in N*m during each dwell, a list or
+            a single value.
+        'repetitions' is the number of cycles in the schedule.
+        'motor_constant' is the motor constant km in N*m/sqrt(W), so winding
+            loss is (tau / km)^2. If None, thermal stats are not computed.
+        'thermal_resistance' is the winding to ambient resistance in K/W.
+        'thermal_time_constant' is the first-order winding time constant in s.
+        'ambient_temp' and 'initial_temp' are the temperatures in C.
+
+    DutyCycle.stats contains the cycle and schedule times, RMS and peak
+        torque, mean mechanical and winding loss power, the winding
+        temperature at the end of the schedule, and the steady state
+        temperature at the end of a cycle.
+    '''
+    def __init__(self, settings, angular_torque_objects):
+
+        self.settings = settings
+        self.moves = list(angular_torque_objects)
+        self.generate()
+
+    def generate(self):
+        self.stats = self._calc_duty_cycle(self.settings)
+
+    def save(self, filename):
+        files._save((self.settings, self.stats), filename)
+
+    def load(self, filename):
+        (self.settings, self.stats) = files._load(filename)
+
+    def print(self, filename=None):
+
+        stats_str = "\n[i] Duty Cycle Stats\n\n"
+        for key, value in self.stats.items():
+            stats_str += key + ': ' + str(value) + '\n'
+
+        if filename:
+            files._txt(stats_str, filename)
+        else:
+            print(stats_str)
+
+    def _get_per_move(self, value):
+        if np.ndim(value) == 0:
+            return [value] * len(self.moves)
+        if len(value) != len(self.moves):
+            raise ValueError("dwell_t and dwell_tau need one value per move.")
+        return list(value)
+
+    def _reduce_move(self, move, km, tau_th, r_th):
+        '''Returns (t, sum(tau^2) * dt, sum(p) * dt, peak tau, thermal map) for one move.'''
+
+        fs = move.lf.lm.settings['fs']
+        dt = 1.0 / fs
+        tau = move.profile['tau'].values
+        hz = move.profile['hz'].values
+
+        t = tau.size * dt
+        tau_sq = np.dot(tau, tau) * dt
+        p = np.dot(tau, hz) * 2.0 * np.pi * dt
+
+        if km is None:
+            return (t, tau_sq, p, np.abs(tau).max(), None)
+
+        # Exact first-order response with loss held constant over each sample.
+        decay = np.exp(-dt / tau_th)
+        weights = np.exp(-np.arange(tau.size - 1, -1, -1) * dt / tau_th)
+        b = r_th * (1.0 - decay) * np.dot(tau * tau, weights) / km**2
+        return (t, tau_sq, p, np.abs(tau).max(), (np.exp(-t / tau_th), b))
+
+    def _calc_duty_cycle(self, settings):
+
+        if len(self.moves) == 0:
+            raise ValueError("At least one move is required.")
+
+        dwell_t = self._get_per_move(settings['dwell_t'])
+        dwell_tau = self._get_per_move(settings.get('dwell_tau', 0.0))
+        repetitions = settings['repetitions']
+        km = settings.get('motor_constant')
+
+        if repetitions < 1:
+            raise ValueError("repetitions must be at least 1.")
+
+        if km is not None:
+            r_th = settings['thermal_resistance']
+            tau_th = settings['thermal_time_constant']
+        else:
+            r_th = tau_th = None
+
+        cycle_t = 0.0
+        cycle_tau_sq = 0.0
+        cycle_p = 0.0
+        tau_peak = 0.0
+        a = 1.0
+        b = 0.0
+
+        for (move, t_dwell, tau_dwell) in zip(self.moves, dwell_t, dwell_tau):
+
+            (t, tau_sq, p, peak, thermal) = self._reduce_move(move, km, tau_th, r_th)
+
+            cycle_t += t + t_dwell
+            cycle_tau_sq += tau_sq + tau_dwell**2 * t_dwell
+            cycle_p += p
+            tau_peak = max(tau_peak, peak, abs(tau_dwell))
+
+            if km is not None:
+                a_dwell = np.exp(-t_dwell / tau_th)
+                b_dwell = r_th * (tau_dwell / km)**2 * (1.0 - a_dwell)
+                (a, b) = (a * thermal[0], thermal[0] * b + thermal[1])
+                (a, b) = (a * a_dwell, a_dwell * b + b_dwell)
+
+        stats = {
+            'moves': len(self.moves),
+            'repetitions': repetitions,
+            'cycle_t': cycle_t,
+            'schedule_t': cycle_t * repetitions,
+            'tau_rms': np.sqrt(cycle_tau_sq / cycle_t),
+            'tau_peak': tau_peak,
+            'p_mean': cycle_p / cycle_t,
+            }
+
+        if km is not None:
+
+            ambient = settings['ambient_temp']
+            initial = settings.get('initial_temp', ambient)
+            if initial is None:
+                initial = ambient
+
+            a_schedule = a**repetitions
+            rise_steady = b / (1.0 - a)
+            rise_final = a_schedule * (initial - ambient) + rise_steady * (1.0 - a_schedule)
+
+            stats['p_loss_mean'] = cycle_tau_sq / (cycle_t * km**2)
+            stats['temp_final'] = ambient + rise_final
+            stats['temp_steady'] = ambient + rise_steady
+            stats['temp_rise_steady'] = rise_steady
+
+        return stats
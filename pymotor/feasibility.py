@@ -0,0 +1,104 @@
+
+import numpy as np
+
+from pymotor.drivetrain import _as_transmission
+from pymotor.profiles import _get_force_constants, _get_torque_constants
+from pymotor.segments import _plan_segments
+
+
+class TorqueFeasibility:
+    '''TorqueFeasibility objects check whether a motor and drivetrain can
+        deliver the torque required by a move, stopping at the first sample
+        where they cannot.
+
+    The move is evaluated from closed-form segments of the LinearMotion
+        settings at the profile sample times, chunk_size samples at a time,
+        using the same force and torque constants as LinearForce and
+        AngularTorque. No profile DataFrame is built or stored. Speeds
+        above Motor.hz_max have no available torque.
+
+    TorqueFeasibility.feasible is True if required torque never exceeds
+        available torque.
+
+    TorqueFeasibility.stats contains 'samples_checked' and, for the first
+        violation, its time 't' (s), speed 'hz' (Hz), required 'tau' and
+        available 'tau_motor' (N*m), and 'shortfall' (N*m). For feasible
+        moves it contains the minimum margin 'margin_min' (N*m) and its time
+        'margin_min_t' (s) instead.
+    '''
+    def __init__(self, lm_settings, lf_settings, motor, coupler=None, gear=None, drivetrain=None,
+        chunk_size=4096):
+
+        self.settings = {'lm_settings': lm_settings, 'lf_settings': lf_settings, 'chunk_size': chunk_size}
+        self.motor = motor
+        self.transmission = _as_transmission(drivetrain, coupler, gear)
+        self.generate()
+
+    def generate(self):
+        (self.feasible, self.stats) = self._check(self.settings)
+
+    def _check(self, settings):
+
+        lm_settings = settings['lm_settings']
+        chunk_size = settings['chunk_size']
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1.")
+
+        fs = lm_settings['fs']
+        segments = _plan_segments(lm_settings)
+        t1s = np.array([segment.t1 for segment in segments])
+        tablen = int(np.floor(segments[-1].t1 * fs)) + 1
+
+        lf_settings = settings['lf_settings']
+        (f_scale, f_offset, f_stats) = _get_force_constants(lf_settings)
+        (xva_scale, tau_rotating_scale, tau_linear_scale, tau_stats) = _get_torque_constants(
+            lf_settings['safety_factor'], lf_settings['moving_mass'], self.motor, self.transmission)
+        motor = self.motor
+
+        margin_min = np.inf
+        margin_min_t = None
+
+        for start in range(0, tablen, chunk_size):
+
+            t = np.arange(start, min(start + chunk_size, tablen)) / fs
+            index = np.minimum(np.searchsorted(t1s, t, side='right'), len(segments) - 1)
+
+            v = np.empty_like(t)
+            a = np.empty_like(t)
+            for (i, segment) in enumerate(segments):
+                mask = index == i
+                if mask.any():
+                    tau = np.minimum(t[mask] - segment.t0, segment.duration)
+                    v[mask] = segment.v(tau)
+                    a[mask] = segment.a(tau)
+
+            hz = v * xva_scale
+            f = a * f_scale + f_offset
+            tau = a * xva_scale * tau_rotating_scale + f * tau_linear_scale
+
+            in_range = hz <= motor.hz_max
+            tau_motor = np.where(in_range, motor.tau_array(np.clip(hz, motor.hz_min, motor.hz_max)), 0.0)
+
+            margin = tau_motor - tau
+            i = margin.argmin()
+
+            if margin[i] < 0.0:
+                first = np.flatnonzero(margin < 0.0)[0]
+                return (False, {
+                    'samples_checked': start + first + 1,
+                    't': t[first],
+                    'hz': hz[first],
+                    'tau': tau[first],
+                    'tau_motor': tau_motor[first],
+                    'shortfall': -margin[first],
+                    })
+
+            if margin[i] < margin_min:
+                margin_min = margin[i]
+                margin_min_t = t[i]
+
+        return (True, {
+            'samples_checked': tablen,
+            'margin_min': margin_min,
+            'margin_min_t': margin_min_t,
+            })
@@ -1,7 +1,11 @@
 
+import numpy as np
 import pandas as pd
 import pickle
 
+XLSX_SHEET_NAME_MAX = 31
+XLSX_SHEET_NAME_INVALID = '[]:*?/\\'
+
 def _save(save_data, filename):
     with open(filename, 'wb') as f:  
         pickle.dump(save_data, f)    
@@ -23,6 +27,70 @@ def _xlsx(df, filename):
     df.to_excel(writer, 'Sheet1')
     writer.save()
 
+def _xlsx_report(reports, filename, max_rows=None):
+    '''Writes (name, settings, stats, df) reports to settings, stats and profile sheets.'''
+    import xlsxwriter
+
+    if max_rows is not None and max_rows < 2:
+        raise ValueError("max_rows must be at least 2 to keep the first and last samples.")
+
+    names = _xlsx_sheet_names([name for (name, settings, stats, df) in reports], len(' settings'))
+
+    workbook = xlsxwriter.Workbook(filename, {'constant_memory': True, 'nan_inf_to_errors': True})
+
+    for (name, (_, settings, stats, df)) in zip(names, reports):
+
+        for (suffix, data) in ((' settings', settings), (' stats', stats)):
+            worksheet = workbook.add_worksheet(name + suffix)
+            worksheet.write_row(0, 0, ['key', 'value'])
+            for (row, (key, value)) in enumerate(data.items(), start=1):
+                worksheet.write_row(row, 0, [str(key), _xlsx_value(value)])
+
+        if df is None:
+            continue
+
+        worksheet = workbook.add_worksheet(name + ' profile')
+        worksheet.write_row(0, 0, [''] + [str(column) for column in df.columns])
+
+        index = np.arange(len(df))
+        if max_rows is not None and len(df) > max_rows:
+            index = np.unique(np.linspace(0, len(df) - 1, max_rows).round().astype(int))
+
+        values = df.values
+        for (row, i) in enumerate(index, start=1):
+            worksheet.write_row(row, 0, [i] + values[i].tolist())
+
+    workbook.close()
+
+def _xlsx_sheet_names(names, suffix_len):
+    '''Returns sanitized sheet name prefixes that fit suffix_len and are unique, ignoring case.'''
+    length = XLSX_SHEET_NAME_MAX - suffix_len
+    sheet_names = []
+    used = set()
+    for name in names:
+        name = ''.join('_' if c in XLSX_SHEET_NAME_INVALID else c for c in name).strip("' ")
+        base = name[:length].rstrip() or 'Profile'
+        sheet_name = base
+        k = 2
+        while sheet_name.lower() in used:
+            tag = ' ' + str(k)
+            sheet_name = name[:length - len(tag)].rstrip() + tag
+            k += 1
+        used.add(sheet_name.lower())
+        sheet_names.append(sheet_name)
+    return sheet_names
+
+def _xlsx_value(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (bool, int, float, str)) or value is None:
+        return value
+    return str(value)
+
 def _txt(text_data, filename):
     with open(filename, 'w') as f:
         print(text_data, file=f)
+
+def _raw(buffer, filename):
+    with open(filename, 'wb') as f:
+        f.write(buffer)
@@ -0,0 +1,133 @@
+
+import numpy as np
+
+import pymotor.files as files
+from pymotor.drivetrain import _as_transmission
+from pymotor.profiles import _get_force_constants, _get_torque_constants
+
+LF_SETTINGS_KEYS = (
+    'safety_factor',
+    'moving_mass',
+    'preload_force',
+    'efficiency',
+    'incline_angle',
+    'friction_coef',
+    'gravity',
+    )
+
+
+class MonteCarloTorque:
+    '''MonteCarloTorque objects evaluate torque margins for many sampled
+        units against one shared LinearMotion profile.
+
+    MonteCarloTorque.settings contains the LinearForce settings keys, where
+        each value is either a number or a distribution, plus:
+        'motor_scale' is a number or distribution multiplying the Motor
+            curve torque, 1.0 if omitted.
+        'samples' is the number of Monte Carlo samples.
+        'chunk_size' is the number of samples evaluated at once, which bounds
+            memory to chunk_size x profile length arrays.
+        'seed' seeds the random number generator. Results do not depend on
+            chunk_size.
+        'percentiles' is a list of percentiles to report.
+
+    Distributions are tuples: ('normal', mean, std), ('uniform', low, high)
+        or ('triangular', low, mode, high). A callable taking a
+        numpy.random.RandomState and a sample count is also accepted.
+
+    MonteCarloTorque.results holds per sample 'tau_max', 'tau_rms' and
+        'margin_min' arrays, where margin is available minus required torque.
+
+    MonteCarloTorque.stats holds the percentiles of each result, for example
+        stats['margin_min_p5'], and 'feasible_fraction', the fraction of
+        samples with a non-negative minimum margin.
+    '''
+    def __init__(self, settings, linear_motion_object, motor, coupler=None, gear=None, drivetrain=None):
+
+        self.settings = settings
+        self.lm = linear_motion_object
+        self.motor = motor
+        self.transmission = _as_transmission(drivetrain, coupler, gear)
+        self.generate()
+
+    def generate(self):
+        self.results = self._calc_results(self.settings)
+        self.stats = self._calc_stats(self.results)
+
+    def save(self, filename):
+        files._save((self.settings, self.stats, self.results), filename)
+
+    def load(self, filename):
+        (self.settings, self.stats, self.results) = files._load(filename)
+
+    def _draw(self, value, rng, samples):
+        '''Returns a (samples, 1) array drawn from a distribution or number.'''
+        if callable(value):
+            drawn = np.asarray(value(rng, samples), dtype='float')
+        elif isinstance(value, (tuple, list)):
+            if value[0] == 'normal':
+                drawn = rng.normal(value[1], value[2], samples)
+            elif value[0] == 'uniform':
+                drawn = rng.uniform(value[1], value[2], samples)
+            elif value[0] == 'triangular':
+                drawn = rng.triangular(value[1], value[2], value[3], samples)
+            else:
+                raise ValueError("Acceptable distributions are 'normal', 'uniform', or 'triangular'.")
+        else:
+            drawn = np.full(samples, float(value))
+        return drawn.reshape(samples, 1)
+
+    def _calc_results(self, settings):
+
+        samples = settings['samples']
+        chunk_size = settings.get('chunk_size', 256)
+
+        if samples < 1 or chunk_size < 1:
+            raise ValueError("samples and chunk_size must be at least 1.")
+
+        # Every distribution is drawn up front in a fixed order, so results
+        # are reproducible for a seed whatever the chunk size.
+        rng = np.random.RandomState(settings.get('seed'))
+        params = {}
+        for key in LF_SETTINGS_KEYS:
+            params[key] = self._draw(settings[key], rng, samples)
+        params['motor_scale'] = self._draw(settings.get('motor_scale', 1.0), rng, samples)
+
+        a = self.lm.profile['a'].values.reshape(1, -1)
+        hz = self.lm.profile['v'].values * self.transmission.xva_scale
+        tau_motor = self.motor.tau_array(hz).reshape(1, -1)
+
+        results = {
+            'tau_max': np.empty(samples),
+            'tau_rms': np.empty(samples),
+            'margin_min': np.empty(samples),
+            }
+
+        for start in range(0, samples, chunk_size):
+
+            chunk = slice(start, min(start + chunk_size, samples))
+            p = {key: value[chunk] for (key, value) in params.items()}
+
+            (f_scale, f_offset, f_stats) = _get_force_constants(p)
+            (xva_scale, tau_rotating_scale, tau_linear_scale, tau_stats) = _get_torque_constants(
+                p['safety_factor'], p['moving_mass'], self.motor, self.transmission)
+
+            tau = (a * f_scale + f_offset) * tau_linear_scale + a * (xva_scale * tau_rotating_scale)
+
+            results['tau_max'][chunk] = tau.max(axis=1)
+            results['tau_rms'][chunk] = np.sqrt(np.mean(tau * tau, axis=1))
+            results['margin_min'][chunk] = (tau_motor * p['motor_scale'] - tau).min(axis=1)
+
+        return results
+
+    def _calc_stats(self, results):
+
+        percentiles = self.settings.get('percentiles', [5, 50, 95])
+
+        stats = {'samples': results['margin_min'].size}
+        for (key, values) in results.items():
+            for (q, value) in zip(percentiles, np.percentile(values, percentiles)):
+                stats[key + '_p' + str(q)] = value
+        stats['feasible_fraction'] = np.mean(results['margin_min'] >= 0.0)
+
+        return stats
@@ -1,11 +1,15 @@
 
 from typing import List
+import numpy as np
 import pandas as pd
+from scipy import interpolate
 
 import pymotor.files as files
 import pymotor.plots as plots
 from pymotor.conversions import *
 
+LUT_SIZE_MAX = 2**20 + 1
+
 
 class Motor:
     '''Motor objects describe a physical motor. 
@@ -21,9 +25,23 @@ class Motor:
 
     Motor.tau(hz) returns an interpolated torque value in N*m.
 
+    Motor.tau_array(hz) returns interpolated torque values in N*m for an
+        array of angular velocities.
+
     Motor.hz_min and Motor.hz_max are created at init and define the range
         for the tau method's hz argument. 
 
+    Motor.lut_interp selects an optional lookup table resampled from the
+        curve on a uniform hz grid at init, so tau lookups become a direct
+        index computation. 'linear' follows the curve points exactly,
+        'pchip' uses a monotone cubic for smoother vendor curves, and None
+        disables the table. The table has lut_size points, or if lut_size
+        is None, is refined until it is within lut_tolerance (N*m) of the
+        chosen interpolation. ValueError is raised if that takes more than
+        LUT_SIZE_MAX points.
+
+    Motor.lut_tau is the lookup table in N*m, or None.
+
     Motor.plot(filename) creates a PNG plot of the torque curve. If the
         filename argument is not included, the plot will attempt to display
         on screen.
@@ -43,6 +61,9 @@ class Motor:
         curve_tau: List[float] = [2.5, 2.2, 1.3, 0.9, 0.7, 0.6, 0.5],
         j: float = gcm2(460),
         d_out: float = inch(0.25),
+        lut_interp: str = None,
+        lut_size: int = None,
+        lut_tolerance: float = 1e-3,
         ):
 
         self.name = str(name)
@@ -69,10 +90,15 @@ class Motor:
         else:
             raise ValueError("curve_hz (Hz) and curve_tau (N*m) values must be positive. curve_hz values must be ascending.")
 
+        self.lut_interp = lut_interp
+        self.lut_tau = self._gen_lut(lut_interp, lut_size, lut_tolerance)
+
             
     def tau(self, hz: float) -> float:
         '''Given speed (Hz) returns interpolated tau (N*m).'''
         if self._hz_range_ok(hz):
+            if self.lut_tau is not None:
+                return float(self._lut_lookup(np.asarray(hz, dtype='float')))
             for i in range(self.curve['hz'].size):
                 if hz <= self.curve['hz'].iloc[i + 1]:
                     hz1 = self.curve['hz'].iloc[i]
@@ -85,6 +111,16 @@ class Motor:
             raise ValueError("hz must be between Motor.hz_min and Motor.hz_max.")
 
 
+    def tau_array(self, hz: np.ndarray) -> np.ndarray:
+        '''Given an array of speeds (Hz) returns interpolated tau (N*m) for each.'''
+        hz = np.asarray(hz, dtype='float')
+        if hz.size and (hz.min() < self.hz_min or hz.max() > self.hz_max):
+            raise ValueError("hz must be between Motor.hz_min and Motor.hz_max.")
+        if self.lut_tau is not None:
+            return self._lut_lookup(hz)
+        return np.interp(hz, self.curve['hz'].values, self.curve['tau'].values)
+
+
     def plot(self, 
         filename: str = None,
         plot_title: str = 'Motor Torque Curve',
@@ -108,6 +144,8 @@ class Motor:
             self.name,
             self.manufacturer,
             self.description,
+            self.lut_interp,
+            self.lut_tau,
         )        
         files._save(save_data, filename)
 
@@ -115,6 +153,8 @@ class Motor:
     def load(self, filename: str):
         '''Load Motor object data from file.'''
         load_data = files._load(filename)
+        if len(load_data) == 8:
+            load_data = load_data + (None, None)
         (
             self.j,
             self.curve,
@@ -124,9 +164,58 @@ class Motor:
             self.name,
             self.manufacturer,
             self.description,
+            self.lut_interp,
+            self.lut_tau,
         ) = load_data
 
 
+    def _gen_lut(self, lut_interp: str, lut_size: int, lut_tolerance: float) -> np.ndarray:
+        '''Resamples the curve on a uniform hz grid, or returns None if lut_interp is None.'''
+        if lut_interp is None:
+            return None
+
+        curve_hz = self.curve['hz'].values
+        curve_tau = self.curve['tau'].values
+
+        if lut_interp == 'linear':
+            reference = lambda hz: np.interp(hz, curve_hz, curve_tau)
+        elif lut_interp == 'pchip':
+            reference = interpolate.PchipInterpolator(curve_hz, curve_tau)
+        else:
+            raise ValueError("Acceptable input for lut_interp is 'linear', 'pchip', or None.")
+
+        if lut_size is not None:
+            if lut_size < 2:
+                raise ValueError("lut_size must be at least 2.")
+            return reference(np.linspace(self.hz_min, self.hz_max, lut_size))
+
+        if lut_tolerance <= 0.0:
+            raise ValueError("lut_tolerance (N*m) must be positive.")
+
+        size = 2 * curve_hz.size
+        while True:
+            grid = np.linspace(self.hz_min, self.hz_max, size)
+            lut_tau = reference(grid)
+            step = grid[1] - grid[0]
+            check = np.concatenate([curve_hz, grid[:-1] + step * 0.25, grid[:-1] + step * 0.5, grid[:-1] + step * 0.75])
+            error = np.abs(np.interp(check, grid, lut_tau) - reference(check)).max()
+            if error <= lut_tolerance:
+                return lut_tau
+            if size >= LUT_SIZE_MAX:
+                raise ValueError("lut_tolerance (N*m) cannot be met within LUT_SIZE_MAX points, "
+                    "the error is " + str(error) + ". Increase lut_tolerance or set lut_size.")
+            size = 2 * size - 1
+
+
+    def _lut_lookup(self, hz: np.ndarray) -> np.ndarray:
+        '''Linear interpolation in the uniform lookup table by direct index.'''
+        last = self.lut_tau.size - 1
+        position = (hz - self.hz_min) * (last / (self.hz_max - self.hz_min))
+        i = np.minimum(position.astype(int), last - 1)
+        fraction = position - i
+        return self.lut_tau[i] + fraction * (self.lut_tau[i + 1] - self.lut_tau[i])
+
+
     def _j_ok(self, j: float) -> bool:
         '''True if j positive.'''
         if j < 0.0:
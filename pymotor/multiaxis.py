@@ -0,0 +1,233 @@
+
+import numpy as np
+import pandas as pd
+
+import pymotor.files as files
+from pymotor.profiles import LinearMotion, _get_force_constants, _get_torque_constants
+from pymotor.drivetrain import _as_transmission
+
+
+class MultiAxisMotion:
+    '''MultiAxisMotion objects hold coordinated linear motion profiles for
+        several axes as (axes x samples) arrays.
+
+    MultiAxisMotion.settings['axes'] is a list of LinearMotion settings
+        dictionaries, one per axis. All axes must share the same fs.
+
+    MultiAxisMotion.settings['sync'] selects synchronized timing. When True,
+        every axis is stretched in time to the duration of the slowest axis,
+        so all axes start and finish together. Distances are unchanged,
+        velocities scale by 1/k, accelerations by 1/k^2 and jerks by 1/k^3.
+
+    MultiAxisMotion.profile is a dictionary of numpy arrays. 't' has shape
+        (samples,), 'x', 'v' and 'a' have shape (axes, samples). Axes that
+        finish early hold their final position.
+
+    MultiAxisMotion.axis(i) returns a LinearMotion style DataFrame for one
+        axis.
+    '''
+    def __init__(self, axis_settings, sync=True):
+
+        self.settings = {
+            'axes': [dict(settings) for settings in axis_settings],
+            'sync': sync,
+            }
+
+        self.generate()
+
+    def generate(self):
+        (self.profile, self.stats) = self._gen_multipro(self.settings)
+
+    def axis(self, i):
+        return pd.DataFrame({
+            't': self.profile['t'],
+            'x': self.profile['x'][i],
+            'v': self.profile['v'][i],
+            'a': self.profile['a'][i],
+            })
+
+    def save(self, filename):
+        files._save((self.settings, self.stats, self.profile), filename)
+
+    def load(self, filename):
+        (self.settings, self.stats, self.profile) = files._load(filename)
+
+    def drop_profile(self):
+        del self.profile
+
+    def _get_axis_t(self, settings):
+        return sum(LinearMotion._get_segment_times(settings))
+
+    def _sync_settings(self, settings, k):
+
+        synced = dict(settings)
+        synced['max_velocity'] = settings['max_velocity'] / k
+
+        for segment in ('acc', 'con', 'dec'):
+            mode = settings[segment + '_mode']
+            if mode == 'time':
+                synced[segment + '_value'] = settings[segment + '_value'] * k
+            elif mode == 'acceleration':
+                synced[segment + '_value'] = settings[segment + '_value'] / k**2
+            elif mode == 'scurve':
+                synced[segment + '_value'] = settings[segment + '_value'] / k**2
+                synced[segment + '_jerk'] = settings[segment + '_jerk'] / k**3
+
+        return synced
+
+    def _gen_multipro(self, settings):
+
+        axes = settings['axes']
+
+        if len(axes) == 0:
+            raise ValueError("At least one axis is required.")
+
+        fs = axes[0]['fs']
+        for axis_settings in axes:
+            if axis_settings['fs'] != fs:
+                raise ValueError("All axes must use the same fs.")
+
+        axis_t = [self._get_axis_t(axis_settings) for axis_settings in axes]
+        sync_t = max(axis_t)
+
+        if settings['sync'] is True:
+            axes = [self._sync_settings(axis_settings, sync_t / t) if t > 0 else axis_settings
+                for (axis_settings, t) in zip(axes, axis_t)]
+
+        axis_profiles = []
+        axis_stats = []
+        for axis_settings in axes:
+            lm = LinearMotion(axis_settings)
+            axis_profiles.append(lm.profile)
+            axis_stats.append(lm.stats)
+
+        tablen = max(axis_profile['x'].size for axis_profile in axis_profiles)
+
+        x = np.empty((len(axes), tablen), dtype='float')
+        v = np.zeros((len(axes), tablen), dtype='float')
+        a = np.zeros((len(axes), tablen), dtype='float')
+
+        for i, axis_profile in enumerate(axis_profiles):
+            size = axis_profile['x'].size
+            x[i, :size] = axis_profile['x'].values
+            x[i, size:] = axis_profile['x'].values[-1]
+            v[i, :size] = axis_profile['v'].values
+            a[i, :size] = axis_profile['a'].values
+
+        t = np.arange(tablen) / fs
+
+        profile = {'t': t, 'x': x, 'v': v, 'a': a}
+
+        stats = {
+            'axes': axis_stats,
+            'axis_t': axis_t,
+            'sync_t': sync_t,
+            'governing_axis': int(np.argmax(axis_t)),
+            'size': tablen,
+            }
+
+        return (profile, stats)
+
+
+class MultiAxisTorque:
+    '''MultiAxisTorque objects compute force and torque for every axis of a
+        MultiAxisMotion object in one vectorized pass.
+
+    Each argument after multi_axis_motion_object is a list with one entry per
+        axis: LinearForce settings dictionaries, Motor objects, and Coupler,
+        Gear and drivetrain objects. Drivetrain entries may be Transmission
+        objects, in which case the coupler and gear entries must be None.
+
+    MultiAxisTorque.profile extends the MultiAxisMotion profile with 'f',
+        'revs', 'hz', 'hzps', 'tau_rotating', 'tau_linear', 'tau' and
+        'tau_motor' arrays of shape (axes, samples).
+
+    MultiAxisTorque.stats['axes'] is a list of per axis stats dictionaries
+        holding the LinearForce and AngularTorque stats of the axis, plus
+        'tau_max' and 'tau_margin_min'.
+    '''
+    def __init__(self, multi_axis_motion_object, lf_settings, motors, couplers, gears, drivetrains):
+
+        self.mm = multi_axis_motion_object
+        self.settings = {'axes': [dict(settings) for settings in lf_settings]}
+        self.motors = list(motors)
+        self.couplers = list(couplers)
+        self.gears = list(gears)
+        self.drivetrains = list(drivetrains)
+        self.generate()
+
+    def generate(self):
+
+        axes = len(self.mm.settings['axes'])
+        for arg in (self.settings['axes'], self.motors, self.couplers, self.gears, self.drivetrains):
+            if len(arg) != axes:
+                raise ValueError("One entry per axis is required for each argument.")
+
+        self.profile = self.mm.profile
+        self.mm.drop_profile()
+
+        self.stats = {'axes': [{} for i in range(axes)]}
+        self._calc_constants()
+
+        x = self.profile['x']
+        v = self.profile['v']
+        a = self.profile['a']
+
+        self.profile['f'] = a * self._f_scale + self._f_offset
+        self.profile['revs'] = x * self._xva_scale
+        self.profile['hz'] = v * self._xva_scale
+        self.profile['hzps'] = a * self._xva_scale
+        self.profile['tau_rotating'] = self.profile['hzps'] * self._tau_rotating_scale
+        self.profile['tau_linear'] = self.profile['f'] * self._tau_linear_scale
+        self.profile['tau'] = self.profile['tau_rotating'] + self.profile['tau_linear']
+
+        self.profile['tau_motor'] = np.empty_like(self.profile['tau'])
+        for i, motor in enumerate(self.motors):
+            self.profile['tau_motor'][i] = motor.tau_array(self.profile['hz'][i])
+
+        tau_max = self.profile['tau'].max(axis=1)
+        tau_margin_min = (self.profile['tau_motor'] - self.profile['tau']).min(axis=1)
+        for i, axis_stats in enumerate(self.stats['axes']):
+            axis_stats['tau_max'] = tau_max[i]
+            axis_stats['tau_margin_min'] = tau_margin_min[i]
+
+    def axis(self, i):
+        return pd.DataFrame({key: value if value.ndim == 1 else value[i]
+            for (key, value) in self.profile.items()})
+
+    def save(self, filename):
+        files._save((self.settings, self.stats, self.profile), filename)
+
+    def load(self, filename):
+        (self.settings, self.stats, self.profile) = files._load(filename)
+
+    def drop_profile(self):
+        del self.profile
+
+    def _calc_constants(self):
+
+        axes = len(self.motors)
+        f_scale = np.empty((axes, 1))
+        f_offset = np.empty((axes, 1))
+        tau_rotating_scale = np.empty((axes, 1))
+        tau_linear_scale = np.empty((axes, 1))
+        xva_scale = np.empty((axes, 1))
+
+        for i in range(axes):
+
+            settings = self.settings['axes'][i]
+            transmission = _as_transmission(self.drivetrains[i], self.couplers[i], self.gears[i])
+
+            (f_scale[i], f_offset[i], f_stats) = _get_force_constants(settings)
+            (xva_scale[i], tau_rotating_scale[i], tau_linear_scale[i], tau_stats) = _get_torque_constants(
+                settings['safety_factor'], settings['moving_mass'], self.motors[i], transmission,
+                self.drivetrains[i])
+
+            self.stats['axes'][i].update(f_stats)
+            self.stats['axes'][i].update(tau_stats)
+
+        self._f_scale = f_scale
+        self._f_offset = f_offset
+        self._tau_rotating_scale = tau_rotating_scale
+        self._tau_linear_scale = tau_linear_scale
+        self._xva_scale = xva_scale
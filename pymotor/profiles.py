@@ -6,6 +6,27 @@ import pandas as pd
 import pymotor.files as files
 import pymotor.plots as plots
 from pymotor.conversions import *
+from pymotor.drivetrain import Transmission, _as_transmission
+from pymotor.segments import Segment
+
+
+def xlsx_report(profiles, filename, max_rows=None):
+    '''Writes settings, stats and profile sheets for a dict of named Profile objects to one xlsx workbook.
+
+    The workbook is streamed row by row in constant memory mode. If max_rows
+        is set, each profile sheet is decimated to at most max_rows rows,
+        keeping the first and last samples, so max_rows must be at least 2.
+
+    Sheet names start with the profile name, with characters Excel does not
+        allow replaced by '_'. Names are truncated to fit, and a number is
+        appended to names that would otherwise repeat.
+    '''
+    reports = []
+    for (name, profile_object) in profiles.items():
+        reports.append((str(name), profile_object.settings, profile_object.stats,
+            getattr(profile_object, 'profile', None)))
+    files._xlsx_report(reports, filename, max_rows)
+
 
 class Profile:
 
@@ -52,6 +73,9 @@ class Profile:
     def xlsx(self, filename):
         files._xlsx(self.profile, filename)
 
+    def xlsx_report(self, filename, name='Profile', max_rows=None):
+        xlsx_report({name: self}, filename, max_rows)
+
     def print(self, filename=None):
 
         profile_str = "\n[i] Profile Data Table\n\n"
@@ -73,6 +97,20 @@ class Profile:
     def drop_profile(self):
         del self.profile
 
+    def _calc_sensitivity_stats(self, column, params):
+
+        y = self.profile[column].values
+        i_max = y.argmax()
+        y_rms = np.sqrt(np.mean(y * y))
+
+        self.stats[column + '_max'] = y[i_max]
+        self.stats[column + '_rms'] = y_rms
+
+        for param in params:
+            dy = self.profile['d' + column + '_d' + param].values
+            self.stats['d' + column + '_max_d' + param] = dy[i_max]
+            self.stats['d' + column + '_rms_d' + param] = np.mean(y * dy) / y_rms
+
 
 class LinearMotion(Profile):
 
@@ -83,11 +121,13 @@ class LinearMotion(Profile):
         acc_mode = 'time',
         acc_value = 1,
         acc_smooth = True,
+        acc_jerk = None,
         con_mode = 'time',
         con_value = 1,
         dec_mode = 'time',
         dec_value = 1,
         dec_smooth = True,
+        dec_jerk = None,
         ):
 
         if settings is None:
@@ -97,11 +137,13 @@ class LinearMotion(Profile):
                 'acc_mode': acc_mode,
                 'acc_value': acc_value,
                 'acc_smooth': acc_smooth,
+                'acc_jerk': acc_jerk,
                 'con_mode': con_mode,
                 'con_value': con_value,
                 'dec_mode': dec_mode,
                 'dec_value': dec_value,
                 'dec_smooth': dec_smooth,
+                'dec_jerk': dec_jerk,
                 }
         else:
             self.settings = settings
@@ -141,15 +183,70 @@ class LinearMotion(Profile):
         t = t / fs
         return t
 
-    def _get_t_from_vmax_and_x(self, v, x):
+    @staticmethod
+    def _get_t_from_vmax_and_x(v, x):
         return (2 * x) / v
 
-    def _get_t_from_vcon_and_x(self, v, x):
+    @staticmethod
+    def _get_t_from_vcon_and_x(v, x):
         return x / v
 
-    def _get_t_from_vmax_and_a(self, v, a):
+    @staticmethod
+    def _get_t_from_vmax_and_a(v, a):
         return v / a
 
+    @staticmethod
+    def _get_t_from_vmax_a_and_j(v, a, j):
+        '''Returns (t, t_jerk) of a jerk-limited ramp to v with peak acceleration a and jerk j.'''
+        if a is None or j is None or a <= 0 or j <= 0:
+            raise ValueError("'scurve' mode requires positive acceleration and jerk values.")
+        if v >= a * a / j:
+            return (v / a + a / j, a / j)
+        t_jerk = np.sqrt(v / j)
+        return (2 * t_jerk, t_jerk)
+
+    @classmethod
+    def _get_segment_times(cls, settings):
+
+        max_velocity = settings['max_velocity']
+        acc_mode = settings['acc_mode']
+        acc_value = settings['acc_value']
+        con_mode = settings['con_mode']
+        con_value = settings['con_value']
+        dec_mode = settings['dec_mode']
+        dec_value = settings['dec_value']
+
+        if acc_mode == 'distance':
+            acc_t1 = cls._get_t_from_vmax_and_x(max_velocity, acc_value)
+        elif acc_mode == 'acceleration':
+            acc_t1 = cls._get_t_from_vmax_and_a(max_velocity, acc_value)
+        elif acc_mode == 'scurve':
+            acc_t1 = cls._get_t_from_vmax_a_and_j(max_velocity, acc_value, settings.get('acc_jerk'))[0]
+        elif acc_mode == 'time':
+            acc_t1 = acc_value
+        else:
+            raise ValueError("Acceptable input for acc_mode is 'distance', 'time', 'acceleration', or 'scurve'.")    
+
+        if con_mode == 'distance':
+            con_t1 = cls._get_t_from_vcon_and_x(max_velocity, con_value)
+        elif con_mode == 'time':
+            con_t1 = con_value
+        else:
+            raise ValueError("Acceptable input for con_mode is 'distance' or 'time'.")
+
+        if dec_mode == 'distance':
+            dec_t1 = cls._get_t_from_vmax_and_x(max_velocity, dec_value)
+        elif dec_mode == 'acceleration':
+            dec_t1 = cls._get_t_from_vmax_and_a(max_velocity, dec_value)
+        elif dec_mode == 'scurve':
+            dec_t1 = cls._get_t_from_vmax_a_and_j(max_velocity, dec_value, settings.get('dec_jerk'))[0]
+        elif dec_mode == 'time':
+            dec_t1 = dec_value
+        else:
+            raise ValueError("Acceptable input for dec_mode is 'distance', 'time', 'acceleration', or 'scurve'.")
+
+        return (acc_t1, con_t1, dec_t1)
+
     def _gen_acc_from_v_and_t(self, v1, t1, fs, smooth):
 
         tablen = np.int(t1 * fs)
@@ -206,16 +303,38 @@ class LinearMotion(Profile):
 
         return profile
 
+    def _gen_scurve_acc_from_v_and_t(self, v1, t1, t_jerk, fs):
+
+        tablen = int(t1 * fs)
+        t = self._gen_t_from_v(np.empty(tablen), fs)
+
+        # Sampled one step in, like the dec segment, so the last sample is
+        # the segment end and the con segment starts from segment.x1.
+        segment = Segment('scurve', t1, 0.0, v1, t_jerk=t_jerk)
+        t_eval = t + 1.0 / fs
+
+        profile = pd.DataFrame({'t': t, 'x': segment.x(t_eval), 'v': segment.v(t_eval), 'a': segment.a(t_eval)})
+
+        return profile
+
+    def _gen_scurve_dec_from_v_and_t(self, v1, t1, t_jerk, x0, fs):
+
+        tablen = int(t1 * fs)
+        t = self._gen_t_from_v(np.empty(tablen), fs)
+
+        # Sampled one step in, like the integrated dec segments, so the
+        # first sample does not repeat the last con position.
+        segment = Segment('scurve', t1, v1, 0.0, x0=x0, t_jerk=t_jerk)
+        t_eval = t + 1.0 / fs
+
+        profile = pd.DataFrame({'t': t, 'x': segment.x(t_eval), 'v': segment.v(t_eval), 'a': segment.a(t_eval)})
+
+        return profile
+
     def _gen_linpro(self, settings):
 
         fs = settings['fs']
         max_velocity = settings['max_velocity']
-        acc_mode = settings['acc_mode']
-        acc_value = settings['acc_value']
-        con_mode = settings['con_mode']
-        con_value = settings['con_value']
-        dec_mode = settings['dec_mode']
-        dec_value = settings['dec_value']
 
         if settings['acc_smooth'] is None or settings['acc_smooth'] is False:
             acc_smooth = False
@@ -227,34 +346,21 @@ class LinearMotion(Profile):
         else:
             dec_smooth = True
 
-        if acc_mode == 'distance':
-            acc_t1 = self._get_t_from_vmax_and_x(max_velocity, acc_value)
-        elif acc_mode == 'acceleration':
-            acc_t1 = self._get_t_from_vmax_and_a(max_velocity, acc_value)
-        elif acc_mode == 'time':
-            acc_t1 = acc_value
-        else:
-            raise ValueError("Acceptable input for acc_mode is 'distance', 'time', or 'acceleration'.")    
-
-        if con_mode == 'distance':
-            con_t1 = self._get_t_from_vcon_and_x(max_velocity, con_value)
-        elif con_mode == 'time':
-            con_t1 = con_value
-        else:
-            raise ValueError("Acceptable input for con_mode is 'distance' or 'time'.")
+        (acc_t1, con_t1, dec_t1) = self._get_segment_times(settings)
 
-        if dec_mode == 'distance':
-            dec_t1 = self._get_t_from_vmax_and_x(max_velocity, dec_value)
-        elif dec_mode == 'acceleration':
-            dec_t1 = self._get_t_from_vmax_and_a(max_velocity, dec_value)
-        elif dec_mode == 'time':
-            dec_t1 = dec_value
+        if settings['acc_mode'] == 'scurve':
+            acc_t_jerk = self._get_t_from_vmax_a_and_j(max_velocity, settings['acc_value'], settings['acc_jerk'])[1]
+            acc_profile = self._gen_scurve_acc_from_v_and_t(v1=max_velocity, t1=acc_t1, t_jerk=acc_t_jerk, fs=fs)
         else:
-            raise ValueError("Acceptable input for dec_mode is 'distance', 'time', or 'acceleration'.")
+            acc_profile = self._gen_acc_from_v_and_t(v1=max_velocity, t1=acc_t1, smooth=acc_smooth, fs=fs)
 
-        acc_profile = self._gen_acc_from_v_and_t(v1=max_velocity, t1=acc_t1, smooth=acc_smooth, fs=fs)
         con_profile = self._gen_con_from_v_and_t(v1=max_velocity, t1=con_t1, x0=acc_profile['x'].iloc[-1], fs=fs)
-        dec_profile = self._gen_dec_from_v_and_t(v1=max_velocity, t1=dec_t1, v0=con_profile['v'].iloc[-1], x0=con_profile['x'].iloc[-1], smooth=dec_smooth, fs=fs)
+
+        if settings['dec_mode'] == 'scurve':
+            dec_t_jerk = self._get_t_from_vmax_a_and_j(max_velocity, settings['dec_value'], settings['dec_jerk'])[1]
+            dec_profile = self._gen_scurve_dec_from_v_and_t(v1=max_velocity, t1=dec_t1, t_jerk=dec_t_jerk, x0=con_profile['x'].iloc[-1], fs=fs)
+        else:
+            dec_profile = self._gen_dec_from_v_and_t(v1=max_velocity, t1=dec_t1, v0=con_profile['v'].iloc[-1], x0=con_profile['x'].iloc[-1], smooth=dec_smooth, fs=fs)
         
         profile = pd.concat([acc_profile, con_profile, dec_profile], ignore_index=True)
         
@@ -284,10 +390,11 @@ class LinearMotion(Profile):
 
 class LinearForce(Profile):
 
-    def __init__(self, settings, linear_motion_object):
+    def __init__(self, settings, linear_motion_object, sensitivities=False):
 
         self.settings = settings
         self.lm = linear_motion_object
+        self.sensitivities = sensitivities
         self.generate()
 
     def generate(self):
@@ -302,6 +409,11 @@ class LinearForce(Profile):
         f_series = f_series.apply(self._get_force)
         self.profile['f'] = f_series
 
+        if self.sensitivities is True:
+            for (param, (scale, offset)) in self._f_sensitivity.items():
+                self.profile['df_d' + param] = self.profile['a'] * scale + offset
+            self._calc_sensitivity_stats('f', self._f_sensitivity)
+
     def plot(self, 
         filename=None,
         plot_title='Required Force',
@@ -316,23 +428,26 @@ class LinearForce(Profile):
 
     def _calc_force_constants(self):
 
+        (self._f_scale, self._f_offset, stats) = _get_force_constants(self.settings)
+
         moving_mass = self.settings['moving_mass']
-        f_preload = self.settings['preload_force']
         incline = self.settings['incline_angle']
         friction_coef = self.settings['friction_coef']
         gravity = self.settings['gravity']
         sf_and_eff = self.settings['safety_factor'] / self.settings['efficiency']
-        
-        f_incline = moving_mass * gravity * np.sin(np.radians(incline))
-        f_friction = friction_coef * moving_mass * gravity * np.cos(np.radians(incline))
-        f_constant = f_preload + f_incline + f_friction
 
-        self._f_scale = sf_and_eff * moving_mass 
-        self._f_offset = sf_and_eff * f_constant
+        # Force is affine in a, and so is its derivative for each parameter:
+        # df/dparam = a * scale + offset. incline_angle is per degree.
+        self._f_sensitivity = {
+            'moving_mass': (sf_and_eff, sf_and_eff * gravity
+                * (np.sin(np.radians(incline)) + friction_coef * np.cos(np.radians(incline)))),
+            'friction_coef': (0.0, sf_and_eff * moving_mass * gravity * np.cos(np.radians(incline))),
+            'incline_angle': (0.0, sf_and_eff * moving_mass * gravity * np.radians(1.0)
+                * (np.cos(np.radians(incline)) - friction_coef * np.sin(np.radians(incline)))),
+            'efficiency': (-self._f_scale / self.settings['efficiency'], -self._f_offset / self.settings['efficiency']),
+            }
 
-        self.stats['f_incline'] = f_incline
-        self.stats['f_friction'] = f_friction
-        self.stats['f_constant'] = f_constant
+        self.stats.update(stats)
 
     def _get_force(self, a):
         return a * self._f_scale + self._f_offset
@@ -340,12 +455,14 @@ class LinearForce(Profile):
 
 class AngularTorque(Profile):
 
-    def __init__(self, linear_force_object, motor, coupler, gear, drivetrain):
+    def __init__(self, linear_force_object, motor, coupler=None, gear=None, drivetrain=None, sensitivities=False):
         self.lf = linear_force_object
         self.motor = motor
         self.coupler = coupler
         self.gear = gear
         self.drivetrain = drivetrain
+        self.transmission = _as_transmission(drivetrain, coupler, gear)
+        self.sensitivities = sensitivities
         self.generate()
 
     def generate(self):
@@ -379,6 +496,32 @@ class AngularTorque(Profile):
         tau_motor_series = self.profile['hz'].copy()
         self.profile['tau_motor'] = tau_motor_series.apply(self._get_tau_motor_from_hz)
 
+        if self.sensitivities is True:
+            self._gen_tau_sensitivities()
+
+    def _gen_tau_sensitivities(self):
+
+        params = []
+
+        for (param, (scale, offset)) in self.lf._f_sensitivity.items():
+            self.profile['dtau_d' + param] = (self.profile['a'] * scale + offset) * self._tau_linear_scale
+            params.append(param)
+
+        elements = self.transmission.elements
+        gears = [i for i in range(len(elements)) if elements[i].type == 'gear']
+
+        if gears:
+            # Sensitivity to the ratio of the first gear: motor speed scales
+            # with the ratio, while the linear torque and the inertia after
+            # the gear are reflected through it.
+            ratio = elements[gears[0]].ratio
+            j_after = self.transmission.j_after(gears[0])
+            self.profile['dtau_dgear_ratio'] = ((self.profile['tau_rotating'] - self.profile['tau_linear'])
+                - self.profile['hzps'] * 4.0 * np.pi * j_after * self.settings['safety_factor']) / ratio
+            params.append('gear_ratio')
+
+        self._calc_sensitivity_stats('tau', params)
+
     def plot(self, 
         filename=None,
         plot_title='Required (Black) and Available (Red) Torque',
@@ -394,30 +537,11 @@ class AngularTorque(Profile):
 
     def _calc_torque_constants(self):
 
-        j_linear = self.lf.settings['moving_mass'] / (2 * np.pi * self.drivetrain.pitch)**2
-        j_in = self.coupler.j + self.gear.j_in
-        j_out = self.gear.j_out + self.drivetrain.j + j_linear
-        j_load = j_in + j_out / self.gear.ratio**2
-        j_ratio = j_load / self.motor.j
-        j_rotating = self.motor.j + j_in + (self.gear.j_out + self.drivetrain.j) / self.gear.ratio**2
-
-        self._tau_rotating_scale = 2.0 * np.pi * j_rotating * self.settings['safety_factor']
-        self._tau_linear_scale = self.drivetrain.lead / (2.0 * np.pi * self.gear.ratio)
-        self._xva_scale = self.drivetrain.pitch * self.gear.ratio
-
-        self.stats['drivetrain_type'] = self.drivetrain.type
-        self.stats['gear_ratio'] = self.gear.ratio
-        self.stats['j_motor'] = self.motor.j
-        self.stats['j_coupler'] = self.coupler.j
-        self.stats['j_gear_in'] = self.gear.j_in
-        self.stats['j_gear_out'] = self.gear.j_out
-        self.stats['j_drivetrain'] = self.drivetrain.j
-        self.stats['j_linear'] = j_linear
-        self.stats['j_in'] = j_in
-        self.stats['j_out'] = j_out
-        self.stats['j_load'] = j_load
-        self.stats['j_ratio'] = j_ratio
-        self.stats['j_rotating'] = j_rotating
+        (self._xva_scale, self._tau_rotating_scale, self._tau_linear_scale, stats) = _get_torque_constants(
+            self.settings['safety_factor'], self.lf.settings['moving_mass'], self.motor, self.transmission,
+            self.drivetrain)
+
+        self.stats.update(stats)
 
     def _get_revs_from_x(self, x):
         return x * self._xva_scale
@@ -436,3 +560,69 @@ class AngularTorque(Profile):
 
     def _get_tau_motor_from_hz(self, hz):
         return self.motor.tau(hz) 
+
+
+def _get_force_constants(settings):
+    '''Given LinearForce settings returns (f_scale, f_offset, stats), where force is a * f_scale + f_offset.
+
+    Settings values may be numbers or numpy arrays, which are broadcast.
+    '''
+    moving_mass = settings['moving_mass']
+    f_preload = settings['preload_force']
+    incline = settings['incline_angle']
+    friction_coef = settings['friction_coef']
+    gravity = settings['gravity']
+    sf_and_eff = settings['safety_factor'] / settings['efficiency']
+
+    f_incline = moving_mass * gravity * np.sin(np.radians(incline))
+    f_friction = friction_coef * moving_mass * gravity * np.cos(np.radians(incline))
+    f_constant = f_preload + f_incline + f_friction
+
+    stats = {
+        'f_incline': f_incline,
+        'f_friction': f_friction,
+        'f_constant': f_constant,
+        }
+
+    return (sf_and_eff * moving_mass, sf_and_eff * f_constant, stats)
+
+
+def _get_torque_constants(safety_factor, moving_mass, motor, transmission, drivetrain=None):
+    '''Returns (xva_scale, tau_rotating_scale, tau_linear_scale, stats) for a Motor driving moving_mass (kg)
+        through a Transmission.
+
+    xva_scale converts m to motor revs, tau_rotating_scale motor Hz/s to N*m
+        and tau_linear_scale force to N*m. The per element inertia stats
+        are included when drivetrain is a Screw or Wheel chained with a
+        Coupler and Gear rather than a Transmission. safety_factor and
+        moving_mass may be numpy arrays, which are broadcast.
+    '''
+    j_linear = moving_mass / (2 * np.pi * transmission.pitch)**2
+    j_in = transmission.j_in
+    j_out = transmission.j_out + j_linear
+    j_load = j_in + j_out / transmission.ratio**2
+    j_rotating = motor.j + transmission.j
+
+    stats = {
+        'drivetrain_type': transmission.elements[-1].type,
+        'gear_ratio': transmission.ratio,
+        'j_motor': motor.j,
+        }
+
+    if drivetrain is not None and not isinstance(drivetrain, Transmission):
+        (coupler, gear, drivetrain) = transmission.elements
+        stats['j_coupler'] = coupler.j
+        stats['j_gear_in'] = gear.j_in
+        stats['j_gear_out'] = gear.j_out
+        stats['j_drivetrain'] = drivetrain.j
+
+    stats['j_linear'] = j_linear
+    stats['j_in'] = j_in
+    stats['j_out'] = j_out
+    stats['j_load'] = j_load
+    stats['j_ratio'] = j_load / motor.j
+    stats['j_rotating'] = j_rotating
+
+    tau_rotating_scale = 2.0 * np.pi * j_rotating * safety_factor
+
+    return (transmission.xva_scale, tau_rotating_scale, transmission.tau_linear_scale, stats)
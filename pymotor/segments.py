@@ -0,0 +1,234 @@
+
+import numpy as np
+
+import pymotor.profiles as profiles
+
+
+class Segment:
+    '''Segment objects evaluate one velocity blend of a linear motion profile
+        in closed form.
+
+    Segment.shape is 'hann' for a raised cosine velocity blend, 'linear' for
+        constant acceleration, 'scurve' for a jerk-limited blend, or 'con'
+        for constant velocity.
+
+    'scurve' blends ramp the acceleration at constant jerk for
+        Segment.t_jerk (s), hold it, and ramp it back to zero over the last
+        Segment.t_jerk. t_jerk is at most half the duration.
+
+    Segment.t0, Segment.x0 and Segment.v0 are the start time (s), position
+        (m) and velocity (m/s). Segment.v1 is the end velocity (m/s) reached
+        after Segment.duration (s).
+
+    Segment.x(t), Segment.v(t) and Segment.a(t) take times (s) measured from
+        Segment.t0 and accept scalars or numpy arrays.
+
+    Segment.t_at_x(x) inverts the position, returning the times (s) from
+        Segment.t0 at which positions x (m) between Segment.x0 and
+        Segment.x1 are reached. It is analytic for 'con' and 'linear'
+        segments and uses vectorized safeguarded Newton iterations for
+        'hann' and 'scurve' segments. Velocity must not be negative.
+    '''
+    def __init__(self, shape, duration, v0, v1, x0=0.0, t0=0.0, t_jerk=None):
+
+        if shape not in ('hann', 'linear', 'scurve', 'con'):
+            raise ValueError("Acceptable input for shape is 'hann', 'linear', 'scurve', or 'con'.")
+        if duration < 0.0:
+            raise ValueError("duration (s) cannot be negative.")
+        if shape == 'scurve' and (t_jerk is None or t_jerk <= 0.0 or t_jerk > 0.5 * duration):
+            raise ValueError("t_jerk (s) must be positive and at most half the duration.")
+
+        self.shape = shape
+        self.duration = duration
+        self.v0 = v0
+        self.v1 = v0 if shape == 'con' else v1
+        self.x0 = x0
+        self.t0 = t0
+        self.t1 = t0 + duration
+        self.x1 = x0 + (self.v0 + self.v1) * 0.5 * duration
+        self.t_jerk = t_jerk
+
+        if shape == 'scurve':
+            self._a_peak = (self.v1 - self.v0) / (duration - t_jerk)
+            self._jerk = self._a_peak / t_jerk
+
+    def x(self, t):
+        dv = self.v1 - self.v0
+        if self.shape == 'hann':
+            w = np.pi / self.duration
+            return self.x0 + self.v0 * t + 0.5 * dv * (t - np.sin(w * t) / w)
+        if self.shape == 'linear':
+            return self.x0 + self.v0 * t + 0.5 * dv * t * t / self.duration
+        if self.shape == 'scurve':
+            (t_jerk, a_peak, jerk) = (self.t_jerk, self._a_peak, self._jerk)
+            r = self.duration - t
+            u = t - t_jerk
+            x_jerk = self.x0 + self.v0 * t_jerk + jerk * t_jerk**3 / 6.0
+            v_jerk = self.v0 + 0.5 * a_peak * t_jerk
+            return np.where(t < t_jerk, self.x0 + self.v0 * t + jerk * t**3 / 6.0,
+                np.where(r < t_jerk, self.x1 - self.v1 * r + jerk * r**3 / 6.0,
+                x_jerk + v_jerk * u + 0.5 * a_peak * u * u))
+        return self.x0 + self.v0 * t
+
+    def v(self, t):
+        dv = self.v1 - self.v0
+        if self.shape == 'hann':
+            return self.v0 + 0.5 * dv * (1.0 - np.cos(np.pi * t / self.duration))
+        if self.shape == 'linear':
+            return self.v0 + dv * t / self.duration
+        if self.shape == 'scurve':
+            (t_jerk, a_peak, jerk) = (self.t_jerk, self._a_peak, self._jerk)
+            r = self.duration - t
+            return np.where(t < t_jerk, self.v0 + 0.5 * jerk * t * t,
+                np.where(r < t_jerk, self.v1 - 0.5 * jerk * r * r,
+                self.v0 + 0.5 * a_peak * t_jerk + a_peak * (t - t_jerk)))
+        return self.v0 + 0.0 * t
+
+    def a(self, t):
+        dv = self.v1 - self.v0
+        if self.shape == 'hann':
+            w = np.pi / self.duration
+            return 0.5 * dv * w * np.sin(w * t)
+        if self.shape == 'linear':
+            return dv / self.duration + 0.0 * t
+        if self.shape == 'scurve':
+            r = self.duration - t
+            return np.where(t < self.t_jerk, self._jerk * t,
+                np.where(r < self.t_jerk, self._jerk * r, self._a_peak + 0.0 * t))
+        return 0.0 * t
+
+    def t_at_x(self, x, tolerance=1e-12, iterations=60):
+
+        c = np.asarray(x, dtype='float') - self.x0
+        dv = self.v1 - self.v0
+
+        if self.shape == 'con':
+            return c / self.v0
+
+        # Stable root of 0.5 * dv / duration * t^2 + v0 * t - c = 0.
+        root = np.sqrt(np.maximum(self.v0 * self.v0 + 2.0 * dv * c / self.duration, 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(c > 0.0, 2.0 * c / (self.v0 + root), 0.0)
+        t = np.clip(t, 0.0, self.duration)
+
+        if self.shape == 'linear':
+            return t
+
+        lo = np.zeros_like(t)
+        hi = np.full_like(t, self.duration)
+        for i in range(iterations):
+            error = self.x(t) - self.x0 - c
+            lo = np.where(error < 0.0, t, lo)
+            hi = np.where(error > 0.0, t, hi)
+            v = self.v(t)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t_newton = t - error / v
+            inside = (v > 0.0) & (t_newton > lo) & (t_newton < hi)
+            t_next = np.where(inside, t_newton, 0.5 * (lo + hi))
+            if np.abs(t_next - t).max(initial=0.0) <= tolerance * self.duration:
+                return t_next
+            t = t_next
+
+        return t
+
+
+class Ramp:
+    '''Ramp objects evaluate a constant jerk piece of a velocity blend in
+        closed form, taking the acceleration from Ramp.a0 to Ramp.a1 (m/s^2)
+        over Ramp.duration (s).
+
+    Ramp.t0, Ramp.x0 and Ramp.v0 are the start time (s), position (m) and
+        velocity (m/s). Ramp.t1, Ramp.x1 and Ramp.v1 are the end values.
+
+    Ramp.x(t), Ramp.v(t) and Ramp.a(t) take times (s) measured from Ramp.t0
+        and accept scalars or numpy arrays.
+    '''
+    def __init__(self, duration, v0, a0, a1, x0=0.0, t0=0.0):
+
+        if duration < 0.0:
+            raise ValueError("duration (s) cannot be negative.")
+
+        self.duration = duration
+        self.v0 = v0
+        self.a0 = a0
+        self.a1 = a1
+        self.x0 = x0
+        self.t0 = t0
+        self.t1 = t0 + duration
+        self._jerk = (a1 - a0) / duration if duration > 0.0 else 0.0
+        self.v1 = self.v(duration)
+        self.x1 = self.x(duration)
+
+    def x(self, t):
+        return self.x0 + self.v0 * t + 0.5 * self.a0 * t * t + self._jerk * t**3 / 6.0
+
+    def v(self, t):
+        return self.v0 + self.a0 * t + 0.5 * self._jerk * t * t
+
+    def a(self, t):
+        return self.a0 + self._jerk * t
+
+
+def _plan_ramps(v0, a0, v1, a_max, jerk, x0=0.0, t0=0.0):
+    '''Returns the Ramps taking velocity from v0 at acceleration a0 to v1 at zero acceleration.
+
+    The blend ramps the acceleration to a peak of at most a_max (m/s^2) at
+        jerk (m/s^3), holds it if needed, and ramps it back to zero. jerk may
+        be np.inf for constant acceleration blends, in which case a0 is not
+        carried. If a0 alone would overshoot v1, the peak has the opposite
+        sign.
+    '''
+    dv = v1 - v0
+
+    if np.isinf(jerk):
+        a0 = 0.0
+        sign = 1.0 if dv >= 0.0 else -1.0
+        a_peak = sign * a_max
+    else:
+        sign = 1.0 if dv >= a0 * abs(a0) / (2.0 * jerk) else -1.0
+        a_peak = sign * min(np.sqrt(max(jerk * sign * dv + 0.5 * a0 * a0, 0.0)), a_max)
+
+    t_ramp0 = abs(a_peak - a0) / jerk
+    t_ramp1 = abs(a_peak) / jerk
+    dv_ramps = 0.5 * (a0 + a_peak) * t_ramp0 + 0.5 * a_peak * t_ramp1
+    t_hold = max((dv - dv_ramps) / a_peak, 0.0) if a_peak != 0.0 else 0.0
+
+    ramps = []
+    (v, x, t) = (v0, x0, t0)
+    for (duration, a_start, a_end) in ((t_ramp0, a0, a_peak), (t_hold, a_peak, a_peak), (t_ramp1, a_peak, 0.0)):
+        if duration > 0.0:
+            ramp = Ramp(duration, v, a_start, a_end, x0=x, t0=t)
+            ramps.append(ramp)
+            (v, x, t) = (ramp.v1, ramp.x1, ramp.t1)
+
+    return ramps
+
+
+def _get_shape(smooth):
+    if smooth is None or smooth is False:
+        return 'linear'
+    return 'hann'
+
+
+def _get_blend(settings, segment):
+    '''Returns (shape, t_jerk) of the acc or dec segment, t_jerk is None unless it is an S-curve.'''
+    if settings[segment + '_mode'] == 'scurve':
+        t_jerk = profiles.LinearMotion._get_t_from_vmax_a_and_j(
+            settings['max_velocity'], settings[segment + '_value'], settings[segment + '_jerk'])[1]
+        return ('scurve', t_jerk)
+    return (_get_shape(settings[segment + '_smooth']), None)
+
+
+def _plan_segments(settings):
+    '''Returns the acc, con and dec Segments described by LinearMotion settings.'''
+
+    max_velocity = settings['max_velocity']
+    (acc_t1, con_t1, dec_t1) = profiles.LinearMotion._get_segment_times(settings)
+    (acc_shape, acc_t_jerk) = _get_blend(settings, 'acc')
+    (dec_shape, dec_t_jerk) = _get_blend(settings, 'dec')
+
+    acc = Segment(acc_shape, acc_t1, 0.0, max_velocity, t_jerk=acc_t_jerk)
+    con = Segment('con', con_t1, max_velocity, max_velocity, x0=acc.x1, t0=acc.t1)
+    dec = Segment(dec_shape, dec_t1, max_velocity, 0.0, x0=con.x1, t0=con.t1, t_jerk=dec_t_jerk)
+
+    return [acc, con, dec]
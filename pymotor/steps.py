@@ -0,0 +1,190 @@
+
+import numpy as np
+
+import pymotor.files as files
+from pymotor.drivetrain import _as_transmission
+from pymotor.segments import _plan_segments
+
+
+class StepTable:
+    '''StepTable objects convert a profile into packed fixed-point integer
+        setpoint tables for step and direction drives.
+
+    profile_object is an AngularTorque object, or a LinearMotion or
+        LinearForce object together with the drivetrain (and optionally
+        coupler and gear) used to scale m to motor revs.
+
+    StepTable.settings keys:
+        'steps_per_rev' is the number of (micro)steps per motor rev.
+        'frac_bits' is the number of fractional bits used for v and hz.
+        'include_hz' adds the motor speed column (AngularTorque only).
+        'dtype' is the integer type, 'int16', 'int32' or 'int64'.
+        'byteorder' is '<' for little-endian or '>' for big-endian.
+
+    StepTable.x is position in steps, StepTable.v is velocity in steps/s and
+        StepTable.hz is motor speed in Hz, each as an integer array scaled by
+        2^frac_bits where noted above.
+
+    The columns are stored as separate contiguous arrays.
+        StepTable.memoryview(column) returns a zero-copy memoryview of one of
+        them. StepTable.table interleaves the columns into a packed record
+        array with one record per sample, built on each access, and
+        StepTable.memoryview() with no column returns a memoryview of it.
+        StepTable.raw(filename, column) writes the same bytes to a raw
+        binary file. Use StepTable.memoryview() rather than
+        memoryview(StepTable), which is not supported.
+    '''
+    def __init__(self, profile_object,
+        steps_per_rev=200,
+        drivetrain=None,
+        coupler=None,
+        gear=None,
+        include_hz=False,
+        frac_bits=0,
+        dtype='int32',
+        byteorder='<',
+        ):
+
+        self.settings = {
+            'steps_per_rev': steps_per_rev,
+            'frac_bits': frac_bits,
+            'include_hz': include_hz,
+            'dtype': dtype,
+            'byteorder': byteorder,
+            }
+
+        self.generate(profile_object, drivetrain, coupler, gear)
+
+    def generate(self, profile_object, drivetrain=None, coupler=None, gear=None):
+
+        steps_per_rev = self.settings['steps_per_rev']
+        frac_scale = 2.0**self.settings['frac_bits']
+        profile = profile_object.profile
+
+        if self.settings['dtype'] not in ('int16', 'int32', 'int64'):
+            raise ValueError("Acceptable input for dtype is 'int16', 'int32', or 'int64'.")
+        if self.settings['byteorder'] not in ('<', '>'):
+            raise ValueError("Acceptable input for byteorder is '<' or '>'.")
+        dtype = np.dtype(self.settings['dtype']).newbyteorder(self.settings['byteorder'])
+
+        if 'revs' in profile:
+            revs = profile['revs'].values
+            hz = profile['hz'].values
+        else:
+            if drivetrain is None:
+                raise ValueError("drivetrain is required to scale LinearMotion and LinearForce profiles.")
+            xva_scale = _as_transmission(drivetrain, coupler, gear).xva_scale
+            revs = profile['x'].values * xva_scale
+            hz = profile['v'].values * xva_scale
+
+        columns = [
+            ('x', revs * steps_per_rev),
+            ('v', hz * steps_per_rev * frac_scale),
+            ]
+
+        if self.settings['include_hz']:
+            if 'revs' not in profile:
+                raise ValueError("include_hz requires an AngularTorque profile.")
+            columns.append(('hz', hz * frac_scale))
+
+        self._dtype = dtype
+        self._columns = [name for (name, values) in columns]
+
+        for (name, values) in columns:
+            setattr(self, name, self._to_fixed(values, dtype, name))
+
+        if not self.settings['include_hz']:
+            self.hz = None
+
+    @property
+    def table(self):
+        table = np.empty(self.x.size, dtype=[(name, self._dtype) for name in self._columns])
+        for name in self._columns:
+            table[name] = getattr(self, name)
+        return table
+
+    def memoryview(self, column=None):
+        '''Zero-copy memoryview of one column array, or a memoryview of the packed table.'''
+        if column is None:
+            return memoryview(self.table)
+        return memoryview(self._get_column(column))
+
+    def raw(self, filename, column=None):
+        '''Writes one column, or the packed table, to a raw binary file.'''
+        files._raw(self.memoryview(column), filename)
+
+    def _get_column(self, column):
+        array = getattr(self, column, None) if column in ('x', 'v', 'hz') else None
+        if array is None:
+            raise ValueError("Acceptable input for column is 'x', 'v', or 'hz' if included.")
+        return array
+
+    def _to_fixed(self, values, dtype, name):
+        fixed = np.rint(values)
+        info = np.iinfo(dtype)
+        if fixed.size and (fixed.min() < info.min or fixed.max() > info.max):
+            raise ValueError("Column '" + name + "' does not fit in " + self.settings['dtype'] + ".")
+        return fixed.astype(dtype)
+
+
+class StepPulses:
+    '''StepPulses objects hold the timestamp of every motor step of an
+        AngularTorque move, found by inverting its position profile instead
+        of sampling it at fs.
+
+    The move is rebuilt from the LinearMotion settings as closed-form
+        segments and scaled to motor revs by the AngularTorque drivetrain.
+        Step k is taken when the motor reaches k / steps_per_rev revs.
+        Constant velocity segments are inverted analytically, accelerating
+        and decelerating segments with vectorized root finding, so the
+        output size scales with the number of steps rather than fs.
+
+    StepPulses.t is the array of step timestamps in s.
+
+    StepPulses.stats contains the step count, the end time of the move, and
+        the minimum step interval and maximum step rate.
+    '''
+    def __init__(self, angular_torque_object, steps_per_rev=200):
+
+        self.settings = {'steps_per_rev': steps_per_rev}
+        self.at = angular_torque_object
+        self.generate()
+
+    def generate(self):
+        (self.t, self.stats) = self._gen_step_times(self.at.lf.lm.settings)
+
+    def save(self, filename):
+        files._save((self.settings, self.stats, self.t), filename)
+
+    def load(self, filename):
+        (self.settings, self.stats, self.t) = files._load(filename)
+
+    def raw(self, filename, dtype='<f8'):
+        '''Writes the step timestamps to a raw binary file.'''
+        files._raw(memoryview(np.ascontiguousarray(self.t, dtype=dtype)), filename)
+
+    def _gen_step_times(self, lm_settings):
+
+        steps_per_m = self.at.transmission.xva_scale * self.settings['steps_per_rev']
+        segments = _plan_segments(lm_settings)
+
+        step_times = []
+        for segment in segments:
+            if segment.duration <= 0.0 or segment.x1 <= segment.x0:
+                continue
+            first = np.floor(segment.x0 * steps_per_m) + 1
+            last = np.floor(segment.x1 * steps_per_m)
+            steps = np.arange(first, last + 1)
+            step_times.append(segment.t0 + segment.t_at_x(steps / steps_per_m))
+
+        t = np.concatenate(step_times) if step_times else np.empty(0)
+        intervals = np.diff(t)
+
+        stats = {
+            'steps': t.size,
+            't_end': segments[-1].t1,
+            'interval_min': intervals.min() if intervals.size else None,
+            'step_rate_max': 1.0 / intervals.min() if intervals.size else None,
+            }
+
+        return (t, stats)
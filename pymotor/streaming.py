@@ -0,0 +1,228 @@
+
+import asyncio
+import time
+
+import numpy as np
+from scipy import optimize
+
+from pymotor.profiles import LinearMotion
+from pymotor.segments import Segment, _plan_segments, _plan_ramps
+
+
+class SetpointStream:
+    '''SetpointStream objects emit (t, x, v, a) setpoints at fs from
+        LinearMotion settings, evaluating closed-form segments so every
+        sample has the same small cost.
+
+    Iterating a SetpointStream yields setpoints, tuples of Python floats,
+        until the move ends at SetpointStream.target with zero velocity.
+
+    SetpointStream.setpoints(realtime=True) is an async generator yielding
+        the same setpoints, paced to wall clock time when realtime is True.
+
+    SetpointStream.set_target(x) and SetpointStream.set_max_velocity(v)
+        replan the rest of the move from the last emitted setpoint. Position,
+        velocity and acceleration stay continuous: replanned blends ramp the
+        acceleration at constant jerk, up to the peak acceleration and jerk
+        of the original acceleration and deceleration blends: the acc_value
+        and acc_jerk (dec_value and dec_jerk) limits of S-curve blends, the
+        peak and initial jerk of Hann blends. Trapezoidal blends have no
+        jerk limit and step the acceleration as they always do. A
+        deceleration is made steeper only if the new target cannot be
+        reached otherwise. Targets behind the current position, and replans
+        after the move has finished, raise ValueError.
+
+    SetpointStream.stats reports the per sample compute latency (s), its
+        jitter (standard deviation, s), the number of samples that took
+        longer than 1/fs, and for realtime async streams the lateness of
+        each setpoint against its scheduled time.
+    '''
+    def __init__(self, settings):
+
+        self.settings = dict(settings)
+        self.fs = settings['fs']
+        self.max_velocity = settings['max_velocity']
+
+        (acc_t1, con_t1, dec_t1) = LinearMotion._get_segment_times(settings)
+        if acc_t1 <= 0.0 or dec_t1 <= 0.0:
+            raise ValueError("Acceleration and deceleration times must be positive.")
+
+        self._segments = _plan_segments(settings)
+        self.target = self._segments[-1].x1
+
+        self._limits = {
+            'acc': self._get_limits(settings, 'acc', self._segments[0]),
+            'dec': self._get_limits(settings, 'dec', self._segments[-1]),
+            }
+
+        self._i = 0
+        self._segment = 0
+        self._done = False
+        self.setpoint = (0.0, 0.0, 0.0, 0.0)
+
+        self._latency = _RunningStats()
+        self._lateness = _RunningStats()
+        self._misses = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+
+        if self._done:
+            raise StopIteration
+
+        start = time.perf_counter()
+
+        t = self._i / self.fs
+        segments = self._segments
+        while self._segment < len(segments) and t >= segments[self._segment].t1:
+            self._segment += 1
+
+        if self._segment < len(segments):
+            segment = segments[self._segment]
+            tau = t - segment.t0
+            setpoint = (t, float(segment.x(tau)), float(segment.v(tau)), float(segment.a(tau)))
+        else:
+            setpoint = (t, float(self.target), 0.0, 0.0)
+            self._done = True
+
+        self._i += 1
+        self.setpoint = setpoint
+
+        latency = time.perf_counter() - start
+        self._latency.add(latency)
+        if latency > 1.0 / self.fs:
+            self._misses += 1
+
+        return setpoint
+
+    async def setpoints(self, realtime=True):
+        '''Async generator of setpoints, paced to wall clock time if realtime is True.'''
+        start = time.perf_counter()
+        for setpoint in self:
+            if realtime:
+                delay = start + setpoint[0] - time.perf_counter()
+                await asyncio.sleep(max(delay, 0.0))
+                self._lateness.add(time.perf_counter() - start - setpoint[0])
+            yield setpoint
+
+    def set_target(self, target):
+        '''Replans the rest of the move to end at target (m).'''
+        self._segments = self._replan(target, self.max_velocity)
+        self._segment = 0
+        self.target = target
+
+    def set_max_velocity(self, max_velocity):
+        '''Replans the rest of the move with a new max_velocity (m/s).'''
+        if max_velocity <= 0.0:
+            raise ValueError("max_velocity (m/s) must be positive.")
+        self._segments = self._replan(self.target, max_velocity)
+        self._segment = 0
+        self.max_velocity = max_velocity
+
+    @property
+    def stats(self):
+
+        stats = {
+            'samples': self._latency.count,
+            'latency_mean': self._latency.mean(),
+            'latency_max': self._latency.max,
+            'latency_jitter': self._latency.std(),
+            'deadline_misses': self._misses,
+            }
+
+        if self._lateness.count:
+            stats['lateness_mean'] = self._lateness.mean()
+            stats['lateness_max'] = self._lateness.max
+            stats['lateness_jitter'] = self._lateness.std()
+
+        return stats
+
+    def _replan(self, target, max_velocity):
+
+        if self._done:
+            raise ValueError("The move has finished and cannot be replanned.")
+
+        (t, x, v, a) = self.setpoint
+        if self._i == 0:
+            t = 0.0
+
+        distance = target - x
+
+        if distance < 0.0 or (distance == 0.0 and v > 0.0):
+            raise ValueError("target (m) cannot be behind the current position.")
+
+        stop = self._get_blend(v, a, 0.0, x, t)
+        if self._get_end(stop, x) >= target:
+            if v == 0.0 and a == 0.0:
+                return []
+            # The target is too close to stop at the deceleration limits, so
+            # the stop is made steeper until it ends at the target.
+            scale_max = 2.0
+            while self._get_end(self._get_blend(v, a, 0.0, x, t, scale_max), x) > target:
+                scale_max *= 2.0
+            scale = optimize.brentq(lambda k: self._get_end(self._get_blend(v, a, 0.0, x, t, k), x) - target,
+                1.0, scale_max)
+            return self._get_blend(v, a, 0.0, x, t, scale)
+
+        def overshoot(v_peak):
+            blend = self._get_blend(v, a, v_peak, x, t)
+            x_blend = self._get_end(blend, x)
+            return self._get_end(self._get_blend(v_peak, 0.0, 0.0, x_blend, 0.0), x_blend) - target
+
+        v_peak = max_velocity
+        if overshoot(v_peak) > 0.0:
+            v_peak = optimize.brentq(overshoot, 0.0, max_velocity)
+
+        blend = self._get_blend(v, a, v_peak, x, t)
+        (x_blend, t_blend) = (self._get_end(blend, x), blend[-1].t1 if blend else t)
+        dec = self._get_blend(v_peak, 0.0, 0.0, x_blend, t_blend)
+        con_t1 = max(target - self._get_end(dec, x_blend), 0.0) / v_peak if v_peak > 0.0 else 0.0
+        con = Segment('con', con_t1, v_peak, v_peak, x0=x_blend, t0=t_blend)
+        dec = self._get_blend(v_peak, 0.0, 0.0, con.x1, con.t1)
+
+        return blend + [con] + dec
+
+    def _get_blend(self, v0, a0, v1, x0, t0, scale=1.0):
+        '''Returns the Ramps of a replanned blend, with the acc or dec limits scaled in time by scale.'''
+        (a_max, jerk) = self._limits['acc' if v1 > v0 else 'dec']
+        return _plan_ramps(v0, a0, v1, a_max * scale, jerk * scale**2, x0, t0)
+
+    def _get_end(self, segments, x0):
+        return segments[-1].x1 if segments else x0
+
+    def _get_limits(self, settings, name, segment):
+        '''Returns the (peak acceleration, jerk) of the acc or dec blend, jerk is np.inf for linear ones.'''
+        if settings[name + '_mode'] == 'scurve':
+            return (settings[name + '_value'], settings[name + '_jerk'])
+        dv = abs(segment.v1 - segment.v0)
+        if segment.shape == 'hann':
+            return (0.5 * np.pi * dv / segment.duration, 0.5 * np.pi**2 * dv / segment.duration**2)
+        return (dv / segment.duration, np.inf)
+
+
+class _RunningStats:
+    '''Constant cost running count, mean, max and standard deviation.'''
+
+    def __init__(self):
+        self.count = 0
+        self.max = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+        if value > self.max:
+            self.max = value
+
+    def mean(self):
+        return self._mean
+
+    def std(self):
+        if self.count < 2:
+            return 0.0
+        return np.sqrt(self._m2 / (self.count - 1))
@@ -13,6 +13,9 @@ setuptools.setup(
             'pandas',
             'scipy',
       ],
+    extras_require={
+            'xlsx': ['xlsxwriter'],
+      },
     author="Randy Rubin",
     author_email="randymrubin@gmail.com",
     description="Generates motion, force and torque profiles for electric motor selection.",